@@ -1,8 +1,50 @@
 import os
+import re
 import json
+import mmap
 import fnmatch
+import functools
 import argparse
+import itertools
 from pathlib import Path
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # Optional: faster state file parsing and serialization
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _pick_io_workers():
+    """Default thread count for directory listing and file reading.
+
+    Both are bound by syscall latency rather than CPU work, so use several
+    threads per CPU this process may run on to keep requests in flight.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return min(64, cpus * 4)
+
+
+IO_WORKERS = _pick_io_workers()
+
+
+# Compiled form of a set of ignore patterns:
+# - names: literal patterns, matched with one set lookup
+# - suffixes / prefixes: '*literal' and 'literal*' patterns, matched with one
+#   str.endswith / str.startswith call
+# - regex_prefixes / prefixed_re: other globs starting with a literal prefix;
+#   the regex only runs when the string starts with one of the prefixes
+# - glob_re: all remaining globs joined into one regex
+Matcher = namedtuple('Matcher', ['names', 'suffixes', 'prefixes', 'regex_prefixes', 'prefixed_re', 'glob_re'])
+
+# `part` is matched against every path component, `path` against the whole
+# relative path
+CompiledIgnore = namedtuple('CompiledIgnore', ['part', 'path'])
 
 
 def load_gitignore(root_dir):
@@ -22,55 +64,138 @@ def load_gitignore(root_dir):
     return patterns
 
 
-def is_ignored(path, gitignore_patterns):
-    path_parts = path.split(os.sep)
-    for pattern in gitignore_patterns:
-        # Check if any part of the path matches the pattern
-        if any(fnmatch.fnmatch(part, pattern) for part in path_parts):
-            return True
-        # Check if the full path matches the pattern
-        if fnmatch.fnmatch(path, pattern):
-            return True
-        # Check if the pattern with a leading '/' matches the path
-        if pattern.startswith('/') and fnmatch.fnmatch(path, pattern[1:]):
-            return True
-        # Check if the pattern with a trailing '/' matches any directory
-        if pattern.endswith('/') and any(fnmatch.fnmatch(f"{part}/", pattern) for part in path_parts):
-            return True
-    return False
+def _union_regex(patterns):
+    if not patterns:
+        # Never matches
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(fnmatch.translate(p) for p in patterns))
+
+
+def _static_prefix(pattern):
+    """Return the part of pattern before its first glob character"""
+    for i, c in enumerate(pattern):
+        if c in '*?[':
+            return pattern[:i]
+    return pattern
+
+
+def _build_matcher(patterns):
+    names = set()
+    suffixes = set()
+    prefixes = set()
+    prefixed = []
+    unprefixed = []
+    for pattern in patterns:
+        prefix = _static_prefix(pattern)
+        if prefix == pattern:
+            names.add(pattern)
+        elif pattern[0] == '*' and _static_prefix(pattern[1:]) == pattern[1:]:
+            suffixes.add(pattern[1:])
+        elif prefix and pattern == prefix + '*':
+            prefixes.add(prefix)
+        elif prefix:
+            prefixed.append(pattern)
+        else:
+            unprefixed.append(pattern)
+    return Matcher(
+        frozenset(names),
+        tuple(suffixes),
+        tuple(prefixes),
+        tuple({_static_prefix(p) for p in prefixed}),
+        _union_regex(prefixed),
+        _union_regex(unprefixed),
+    )
+
+
+def matches(matcher, s):
+    return (s in matcher.names or
+            s.endswith(matcher.suffixes) or
+            s.startswith(matcher.prefixes) or
+            (s.startswith(matcher.regex_prefixes) and matcher.prefixed_re.match(s) is not None) or
+            matcher.glob_re.match(s) is not None)
+
+
+def compile_ignore(patterns):
+    """Compile ignore patterns into a CompiledIgnore"""
+    return _compile_ignore(tuple(patterns))
+
+
+# Compiled results are cached, so repeated runs in one process with the same
+# patterns don't pay for the translation again
+@functools.lru_cache(maxsize=32)
+def _compile_ignore(patterns):
+    part_patterns = [os.path.normcase(p) for p in patterns]
+    path_patterns = list(part_patterns)
+    # Check for '/' on the raw patterns, since normcase turns it into a
+    # backslash on Windows
+    for pattern in patterns:
+        # A leading '/' anchors the pattern to the root directory
+        if pattern.startswith('/'):
+            path_patterns.append(os.path.normcase(pattern[1:]))
+        # A trailing '/' matches a directory name anywhere in the path
+        if pattern.endswith('/'):
+            part_patterns.append(os.path.normcase(pattern[:-1]))
+    return CompiledIgnore(_build_matcher(part_patterns), _build_matcher(path_patterns))
 
 
 def load_state(state_file):
     if os.path.exists(state_file):
-        with open(state_file, 'r') as f:
-            state = json.load(f)
-            # Convert lists to sets for efficient lookup
-            state['skipped_dirs'] = set(state.get('skipped_dirs', []))
-            state['selected_dirs'] = set(state.get('selected_dirs', []))
-            return state
+        with open(state_file, 'rb') as f:
+            data = f.read()
+        state = None
+        if orjson:
+            try:
+                state = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # json escapes file names that aren't valid UTF-8 as lone
+                # surrogates, which orjson refuses to read
+                pass
+        if state is None:
+            state = json.loads(data)
+        # Convert lists to sets for efficient lookup
+        state['skipped_dirs'] = set(state.get('skipped_dirs', []))
+        state['selected_dirs'] = set(state.get('selected_dirs', []))
+        return state
     return {'selected_files': {}, 'skipped_dirs': set(), 'selected_dirs': set()}
 
 
 def save_state(state_file, state):
-    # Convert sets to lists for JSON serialization
+    # Convert sets to sorted lists for JSON serialization, so the state file
+    # is the same for the same selections
     json_state = {
         'root_dir': state['root_dir'],
         'selected_files': state['selected_files'],
-        'skipped_dirs': list(state['skipped_dirs']),
-        'selected_dirs': list(state['selected_dirs'])
+        'skipped_dirs': sorted(state['skipped_dirs']),
+        'selected_dirs': sorted(state['selected_dirs'])
     }
-    with open(state_file, 'w') as f:
-        json.dump(json_state, f, indent=2)
+    data = None
+    if orjson:
+        try:
+            data = orjson.dumps(json_state, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            # File names that aren't valid UTF-8 come from os as strings with
+            # lone surrogates, which only json can write
+            pass
+    if data is None:
+        data = json.dumps(json_state, indent=2).encode()
+    # Write a temporary file and rename it over the old state, so an
+    # interrupted save never leaves a truncated state file behind
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, state_file)
 
 
 def clean_missing_files(root_dir, selected_files):
     """Remove missing files from the state and return cleaned selected files dict"""
     cleaned_files = {}
     removed_files = []
+    root_prefix = os.path.join(root_dir, '')
     
     for file_path, include in selected_files.items():
-        full_path = os.path.join(root_dir, file_path)
-        if os.path.exists(full_path):
+        if os.path.exists(root_prefix + file_path):
             cleaned_files[file_path] = include
         else:
             removed_files.append(file_path)
@@ -83,7 +208,117 @@ def clean_missing_files(root_dir, selected_files):
     return cleaned_files
 
 
-def select_files(root_dir, gitignore_patterns, existing_state, state_file, script_name, output_file):
+def _scan_dir(path):
+    """Return (dir_entries, file_entries) of a directory path or descriptor, or None if it can't be read"""
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return None
+
+    dir_entries = []
+    file_entries = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            dir_entries.append(entry)
+        else:
+            file_entries.append(entry)
+    return dir_entries, file_entries
+
+
+# Where supported, directories are listed through a file descriptor so that
+# DirEntry.stat() resolves only the entry name relative to it (fstatat)
+# instead of walking the full path again
+_SCANDIR_FD = os.scandir in os.supports_fd and hasattr(os, 'O_DIRECTORY')
+
+
+def _in_declined(rel_path, declined):
+    """Return True if rel_path or one of its parent directories is in declined"""
+    while rel_path:
+        if rel_path in declined:
+            return True
+        rel_path = os.path.dirname(rel_path)
+    return False
+
+
+def scan_tree(pool, top, filter_dir, declined=frozenset()):
+    """Start listing the directory tree under top on a thread pool.
+
+    filter_dir(rel_path, dir_entries, file_entries) runs on the worker that
+    listed a directory and returns the (dir_entries, file_entries) to keep; only
+    kept subdirectories are scanned further. Entries' stat() and is_*() methods
+    must only be used inside filter_dir, the directory's descriptor is closed
+    afterwards. Returns a dict mapping relative directory paths to futures of
+    their filtered entries. Subdirectories are added before their parent's
+    future completes, so walk_tree can consume the tree while the rest of it
+    is still being scanned.
+
+    declined is a set of relative directory paths the caller may add to while
+    the scan runs; directories in it, and everything under them, are not
+    listed once it has been added.
+    """
+    tree = {}
+
+    def scan(rel_path, path):
+        if declined and _in_declined(rel_path, declined):
+            return None
+        dir_fd = None
+        if _SCANDIR_FD:
+            try:
+                dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+            except OSError:
+                return None
+        try:
+            result = _scan_dir(path if dir_fd is None else dir_fd)
+            if result is None:
+                return None
+            dir_entries, file_entries = filter_dir(rel_path, *result)
+            prefix = rel_path + os.sep if rel_path else ''
+            for entry in dir_entries:
+                # Don't follow symlinked directories, same as os.walk
+                if not entry.is_symlink():
+                    dir_path = prefix + entry.name
+                    tree[dir_path] = pool.submit(scan, dir_path, os.path.join(path, entry.name))
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+        return dir_entries, file_entries
+
+    tree[''] = pool.submit(scan, '', top)
+    return tree
+
+
+def walk_tree(tree, rel_path=''):
+    """os.walk-like generator over a scan_tree result yielding (rel_path, dir_entries, file_entries).
+
+    Waits for each directory's listing as it gets to it. As with os.walk,
+    remove entries from dir_entries to avoid descending into them.
+    """
+    # An explicit stack instead of recursion, so deep trees neither hit the
+    # recursion limit nor pass every item up a chain of nested generators
+    stack = [rel_path]
+    while stack:
+        rel_path = stack.pop()
+        future = tree.get(rel_path)
+        if future is None:
+            continue
+        result = future.result()
+        if result is None:
+            continue
+        dir_entries, file_entries = result
+        dir_entries = list(dir_entries)
+        yield rel_path, dir_entries, file_entries
+        prefix = rel_path + os.sep if rel_path else ''
+        # Pushed in reverse so subdirectories are visited in listing order
+        stack.extend(prefix + entry.name for entry in reversed(dir_entries))
+
+
+def select_files(root_dir, gitignore_patterns, existing_state, state_file, script_name, output_file,
+                 by_extension=False, assume_yes=False, scan_threads=None):
     selected_files = existing_state.get('selected_files', {})
     skipped_dirs = existing_state.get('skipped_dirs', set())
     selected_dirs = existing_state.get('selected_dirs', set())
@@ -101,83 +336,209 @@ def select_files(root_dir, gitignore_patterns, existing_state, state_file, scrip
         os.path.basename(state_file),
         os.path.basename(output_file)
     ]
-    all_ignore_patterns = gitignore_patterns + script_ignore_patterns
-
-    for root, dirs, files in os.walk(abs_root_dir, topdown=True):
-        # Calculate relative path from the root directory
-        rel_path = os.path.relpath(root, abs_root_dir)
-        if rel_path == '.':
-            rel_path = ''
-
-        # First, handle directories
-        filtered_dirs = []
-        for d in dirs:
-            dir_path = os.path.normpath(os.path.join(rel_path, d))
-            full_dir_path = os.path.normpath(os.path.join(abs_root_dir, dir_path))
-            
-            # Skip already ignored directories
-            if is_ignored(dir_path, all_ignore_patterns):
-                continue
-                
-            # Skip previously skipped directories
-            if dir_path in skipped_dirs:
-                continue
+    ignore = compile_ignore(gitignore_patterns + script_ignore_patterns)
 
-            # Include previously selected directories
-            if dir_path in selected_dirs:
-                filtered_dirs.append(d)
-                continue
-                
-            # Ask about new directories with relative path
-            include = input(f"Include directory '{dir_path}'? (y/n): ").lower() == 'y'
-            if include:
-                filtered_dirs.append(d)
-                selected_dirs.add(dir_path)
-            else:
-                skipped_dirs.add(dir_path)
-                    
-        # Update dirs in-place to only process chosen directories
-        dirs[:] = filtered_dirs
-
-        # Now handle files in included directories
-        for file in files:
-            file_path = os.path.normpath(os.path.join(rel_path, file))
-            
-            # Skip ignored files (including script-specific files)
-            if (is_ignored(file_path, all_ignore_patterns) or
-                file.startswith('.') or
-                file == '__init__.py'):
+    # File names that are never offered
+    always_skip = frozenset(['__init__.py'] + script_ignore_patterns)
+
+    # The same names (src, tests, main.py, ...) show up all over a tree, so
+    # remember the ignore decision for each one
+    name_ignored_cache = {}
+
+    def entry_ignored(path, name):
+        ignored = name_ignored_cache.get(name)
+        if ignored is None:
+            ignored = matches(ignore.part, os.path.normcase(name))
+            name_ignored_cache[name] = ignored
+        if ignored:
+            return True
+        # Parent directories were already checked when they were scanned, so
+        # only the full path is left to match
+        return matches(ignore.path, os.path.normcase(path))
+
+    # Directories skipped in earlier runs are never listed
+    previously_skipped = frozenset(skipped_dirs)
+
+    # Directories declined during this run, so the scan stops descending into
+    # them while the user answers the remaining prompts
+    declined_dirs = set()
+
+    def filter_dir(rel_path, dir_entries, file_entries):
+        # Runs on the scanning threads and drops everything that can be
+        # decided without asking the user
+        prefix = rel_path + os.sep if rel_path else ''
+        kept_dirs = []
+        for entry in dir_entries:
+            dir_path = prefix + entry.name
+            if not entry_ignored(dir_path, entry.name) and dir_path not in previously_skipped:
+                kept_dirs.append(entry)
+
+        kept_files = []
+        for entry in file_entries:
+            file = entry.name
+
+            # Skip hidden, always-skipped and ignored files, cheapest checks first
+            if (file in always_skip or
+                file[:1] == '.' or
+                entry_ignored(prefix + file, file)):
                 continue
 
-            full_path = os.path.join(abs_root_dir, file_path)
-            if os.path.getsize(full_path) == 0:
+            # DirEntry caches its stat result (Windows fills it in during scandir).
+            # Entries that can't be stat'ed, e.g. broken symlinks, are skipped
+            try:
+                if entry.stat().st_size == 0:
+                    continue
+            except OSError:
                 continue
 
-            if file_path not in selected_files:
-                new_files.append(file_path)
+            kept_files.append(entry)
+        return kept_dirs, kept_files
+
+    pool = ThreadPoolExecutor(max_workers=scan_threads or IO_WORKERS)
+    try:
+        # The tree is listed in the background while the user answers prompts
+        tree = scan_tree(pool, abs_root_dir, filter_dir, declined_dirs)
+
+        for rel_path, dirs, files in walk_tree(tree):
+            # Child paths are built by concatenation; rel_path is already normalized
+            prefix = rel_path + os.sep if rel_path else ''
+
+            # First, handle directories (ignored and previously skipped ones are already gone)
+            filtered_dirs = []
+            for d in dirs:
+                dir_path = prefix + d.name
+
+                # Include previously selected directories
+                if dir_path in selected_dirs:
+                    filtered_dirs.append(d)
+                    continue
+
+                # Ask about new directories with relative path
+                include = assume_yes or input(f"Include directory '{dir_path}'? (y/n): ").lower() == 'y'
+                if include:
+                    filtered_dirs.append(d)
+                    selected_dirs.add(dir_path)
+                else:
+                    skipped_dirs.add(dir_path)
+                    declined_dirs.add(dir_path)
+
+            # Update dirs in-place to only process chosen directories
+            dirs[:] = filtered_dirs
+
+            # Now collect candidate files in included directories
+            for entry in files:
+                file_path = prefix + entry.name
+                if file_path not in selected_files:
+                    new_files.append(file_path)
+    finally:
+        # Drop whatever is still queued, e.g. after Ctrl-C
+        pool.shutdown(wait=False, cancel_futures=True)
 
     if new_files:
         print("\nNew files found:")
+        if by_extension:
+            ext_counts = Counter(os.path.splitext(file_path)[1] for file_path in new_files)
+            ext_decisions = {}
         for file_path in new_files:
-            # Show relative path when asking about files
-            include = input(f"Include '{file_path}'? (y/n): ").lower() == 'y'
+            if assume_yes:
+                print(f"+ {file_path}")
+                include = True
+            elif by_extension:
+                # Ask once per extension, the first time it comes up
+                ext = os.path.splitext(file_path)[1]
+                if ext not in ext_decisions:
+                    kind = f"'{ext}'" if ext else "extensionless"
+                    ext_decisions[ext] = input(
+                        f"Include {ext_counts[ext]} new {kind} file(s)? (y/n): ").lower() == 'y'
+                include = ext_decisions[ext]
+            else:
+                # Show relative path when asking about files
+                include = input(f"Include '{file_path}'? (y/n): ").lower() == 'y'
             selected_files[file_path] = include
 
     return selected_files, skipped_dirs, selected_dirs
 
 
-def dump_files(root_dir, selected_files, output_file):
-    with open(output_file, 'w') as out:
-        for file_path, include in selected_files.items():
-            if include:
-                full_path = os.path.join(root_dir, file_path)
-                out.write(f"{file_path}:\n")
-                try:
-                    with open(full_path, 'r') as f:
-                        out.write(f.read())
-                except UnicodeDecodeError:
-                    out.write(f"Unable to read file: {file_path} (possibly binary)\n")
-                out.write("\n\n")
+# Number of leading bytes checked for NUL when deciding if a file is binary
+BINARY_SNIFF_SIZE = 8192
+
+# Files larger than this are memory-mapped when dumped instead of read ahead
+MMAP_THRESHOLD = 512 * 1024
+
+
+def _read_ahead(full_path):
+    """Read a file to dump on a worker thread.
+
+    Returns its contents, or None if it is larger than MMAP_THRESHOLD and left
+    for _large_file_chunks to map instead.
+    """
+    with open(full_path, 'rb') as f:
+        data = f.read(BINARY_SNIFF_SIZE)
+        if len(data) == BINARY_SNIFF_SIZE:
+            if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+                return None
+            data += f.read()
+    return data
+
+
+def _large_file_chunks(full_path, file_path):
+    with open(full_path, 'rb') as f:
+        head = f.read(BINARY_SNIFF_SIZE)
+        if b'\0' in head:
+            yield f"Unable to read file: {file_path} (possibly binary)\n".encode()
+        elif len(head) < BINARY_SNIFF_SIZE:
+            # Shrunk since it was read ahead
+            yield head
+        else:
+            # Let the kernel page large files in instead of copying them
+            # through Python buffers
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, 'madvise'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                yield mm
+
+
+def _dump_chunks(root_dir, selected_files, workers):
+    """Yield the dump as byte chunks: a header, the body and a separator per file"""
+    file_paths = iter([p for p, include in selected_files.items() if include])
+    # Full paths are built by concatenation instead of os.path.join per file
+    root_prefix = os.path.join(root_dir, '')
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Files are read on the pool a bounded number ahead of the one being
+        # written, so open/read latency overlaps without holding every file
+        pending = deque()
+        for file_path in itertools.islice(file_paths, 2 * workers):
+            pending.append((file_path, pool.submit(_read_ahead, root_prefix + file_path)))
+
+        while pending:
+            file_path, future = pending.popleft()
+            for next_path in itertools.islice(file_paths, 1):
+                pending.append((next_path, pool.submit(_read_ahead, root_prefix + next_path)))
+
+            data = future.result()
+            yield f"{file_path}:\n".encode()
+            if data is None:
+                yield from _large_file_chunks(root_prefix + file_path, file_path)
+            elif b'\0' in data[:BINARY_SNIFF_SIZE]:
+                yield f"Unable to read file: {file_path} (possibly binary)\n".encode()
+            else:
+                yield data
+            yield b"\n\n"
+
+
+def dump_files(root_dir, selected_files, output_file, scan_threads=None):
+    # File bodies are copied as raw bytes, without a decode/encode round trip.
+    # A large buffer turns many small files into few write calls.
+    with open(output_file, 'wb', buffering=1 << 20) as out:
+        out.writelines(_dump_chunks(root_dir, selected_files, scan_threads or IO_WORKERS))
+
+
+def positive_int(value):
+    """argparse type for options that need a count of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
 
 
 def main():
@@ -185,6 +546,12 @@ def main():
     parser.add_argument("--root-dir", help="Root directory to start file dumping", default=os.getcwd())
     parser.add_argument("--output-file", help="Output file name", default="dumped_files.txt")
     parser.add_argument("--state-file", help="Path to state file", default=".file_dumper_state.json")
+    parser.add_argument("--by-extension", action="store_true",
+                        help="Ask once per file extension instead of once per new file")
+    parser.add_argument("-y", "--yes", action="store_true",
+                        help="Include all new directories and files without asking")
+    parser.add_argument("--scan-threads", type=positive_int, default=IO_WORKERS,
+                        help="Threads used to list directories and read files (default: %(default)s)")
     args = parser.parse_args()
 
     root_dir = args.root_dir
@@ -196,7 +563,8 @@ def main():
 
     selected_files, skipped_dirs, selected_dirs = select_files(
         root_dir, gitignore_patterns, existing_state, state_file, 
-        os.path.basename(__file__), output_file
+        os.path.basename(__file__), output_file,
+        by_extension=args.by_extension, assume_yes=args.yes, scan_threads=args.scan_threads
     )
 
     new_state = {
@@ -206,7 +574,7 @@ def main():
         'selected_dirs': selected_dirs
     }
     save_state(state_file, new_state)
-    dump_files(root_dir, selected_files, output_file)
+    dump_files(root_dir, selected_files, output_file, scan_threads=args.scan_threads)
     print(f"\nFiles dumped to {output_file}")
 
 